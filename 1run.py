@@ -1,9 +1,17 @@
 import os
-import io
 import html
 import pandas as pd
 import streamlit as st
 
+from wrpf.core import (
+    TABLE_CSS,
+    filter_choices,
+    filter_with_controls,
+    load_qualifying_bundle,
+    render_filter_controls,
+    show_table,
+)
+
 st.set_page_config(page_title="WRPF UK — Qualifying Totals", layout="wide")
 
 
@@ -336,6 +344,8 @@ def inject_app_style():
       background: var(--wrpf-good-bg);
       color: #065f46;
     }
+
+    """ + TABLE_CSS + """
     </style>
     """, unsafe_allow_html=True)
 
@@ -351,127 +361,6 @@ def render_page_hero():
     </div>
     """, unsafe_allow_html=True)
 
-def load_qualifying_table(file_path_or_obj) -> pd.DataFrame:
-    name = ""
-    if isinstance(file_path_or_obj, (io.BytesIO, io.StringIO)) or hasattr(file_path_or_obj, "read"):
-        name = getattr(file_path_or_obj, "name", "").lower()
-    else:
-        name = str(file_path_or_obj).lower()
-
-    if name.endswith((".xlsx", ".xls")) or (isinstance(file_path_or_obj, str) and os.path.exists(file_path_or_obj)):
-        xls = pd.ExcelFile(file_path_or_obj)
-        frames = [pd.read_excel(xls, sheet_name=sheet) for sheet in xls.sheet_names]
-        wide = pd.concat(frames, ignore_index=True)
-    elif name.endswith(".csv"):
-        wide = pd.read_csv(file_path_or_obj)
-    else:
-        raise ValueError("Unsupported file type or file not found.")
-
-    base_cols = {"Age Category", "Sex", "Event", "Tested", "Equipment"}
-    weight_cols = [c for c in wide.columns if c not in base_cols]
-
-    long_df = wide.melt(
-        id_vars=["Age Category", "Sex", "Event", "Tested", "Equipment"],
-        value_vars=weight_cols,
-        var_name="WeightClassKg",
-        value_name="QualifyingTotalKg",
-    )
-
-    for c in ["Age Category", "Sex", "Event", "Tested", "Equipment", "WeightClassKg"]:
-        long_df[c] = long_df[c].astype(str).str.strip()
-    long_df = long_df[~long_df["QualifyingTotalKg"].isna()]
-
-    tested_map = {
-        "yes": "Tested", "true": "Tested", "tested": "Tested",
-        "no": "Untested", "false": "Untested", "untested": "Untested",
-    }
-    long_df["Tested"] = long_df["Tested"].str.lower().map(tested_map).fillna(long_df["Tested"])
-
-    return long_df
-
-
-def numeric_sort_key_wc(x: str):
-    s = str(x)
-    try:
-        return (float(s.replace("+", "")), s)
-    except ValueError:
-        return (float("inf"), s)
-
-
-def reset_filters():
-    for key in ["gender", "ages", "wcs_male", "wcs_female", "equipment", "tested_state"]:
-        if key in st.session_state:
-            del st.session_state[key]
-
-
-def filter_with_controls(df: pd.DataFrame) -> pd.DataFrame:
-    gender = st.session_state.get("gender") or []
-    ages = st.session_state.get("ages") or []
-    wcs_male = st.session_state.get("wcs_male") or []
-    wcs_female = st.session_state.get("wcs_female") or []
-    equipment = st.session_state.get("equipment") or []
-    tested_state = st.session_state.get("tested_state", "All")
-
-    out = df.copy()
-
-    if gender:
-        out = out[out["Sex"].isin(gender)]
-
-    if ages:
-        out = out[out["Age Category"].isin(ages)]
-
-    if gender == ["Female"]:
-        if wcs_female:
-            out = out[out["WeightClassKg"].isin(wcs_female)]
-    elif gender == ["Male"]:
-        if wcs_male:
-            out = out[out["WeightClassKg"].isin(wcs_male)]
-    else:
-        combined = list(set(wcs_male) | set(wcs_female))
-        if combined:
-            out = out[out["WeightClassKg"].isin(combined)]
-
-    if equipment:
-        out = out[out["Equipment"].isin(equipment)]
-
-    if tested_state == "Tested":
-        out = out[out["Tested"].str.lower() == "tested"]
-    elif tested_state == "Untested":
-        out = out[out["Tested"].str.lower() == "untested"]
-
-    return out
-
-
-def show_table(df: pd.DataFrame, title: str):
-    st.markdown(f"### {title}")
-    st.markdown("""
-    <style>
-    .stDataFrame [data-testid="stHeader"] { position: sticky; top: 0; z-index: 1; }
-    .stDataFrame [role="gridcell"] { border-bottom: 1px solid rgba(0,0,0,0.05); }
-    .stDataFrame tbody tr:nth-child(even) [role="gridcell"] { background: rgba(0,0,0,0.02); }
-    .stDataFrame th div p { font-weight: 700; letter-spacing: .2px; }
-    </style>
-    """, unsafe_allow_html=True)
-
-    display_cols = [
-        "Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg", "QualifyingTotalKg",
-    ]
-    view_to_show = (
-        df[display_cols]
-        .sort_values(by=["Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg"], kind="mergesort")
-    )
-
-    st.dataframe(view_to_show, use_container_width=True, hide_index=True)
-
-    csv_bytes = view_to_show.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        f"Download {title} (CSV)",
-        data=csv_bytes,
-        file_name=f"qualifying_totals_{title.replace(' ', '_').lower()}.csv",
-        mime="text/csv",
-        use_container_width=True,
-    )
-
 QUALIFIED_FILE = "Qualified.csv"
 
 
@@ -482,7 +371,10 @@ def normalise_yes(value) -> str:
     return ""
 
 
-def load_qualified_athletes(file_path: str) -> pd.DataFrame:
+@st.cache_data(show_spinner=False)
+def load_qualified_athletes(file_path: str, mtime: float) -> pd.DataFrame:
+    # Cached per file version (mtime is only part of the key) so the search
+    # columns below are built once, not on every keystroke's rerun.
     qualified = pd.read_csv(file_path, encoding="utf-8-sig")
     qualified.columns = [str(c).strip() for c in qualified.columns]
 
@@ -510,6 +402,9 @@ def load_qualified_athletes(file_path: str) -> pd.DataFrame:
         })
     )
 
+    # Arrow-backed so substring search runs as one pyarrow match_substring kernel.
+    qualified["_SearchName"] = qualified["Name"].str.lower().astype("string[pyarrow]")
+
     return qualified.sort_values("Name", kind="mergesort").reset_index(drop=True)
 
 
@@ -581,109 +476,51 @@ if not os.path.exists(DEFAULT_FILE):
     )
     st.stop()
 
+# (path, mtime) of every workbook that loaded; keys the filter-choice cache.
+loaded_sources = [(DEFAULT_FILE, os.path.getmtime(DEFAULT_FILE))]
+
 try:
-    data = load_qualifying_table(DEFAULT_FILE)
+    bundle = load_qualifying_bundle(*loaded_sources[0])
 except Exception as e:
     st.error(f"Could not read FP.xlsx. Please check the format. Details: {e}")
     st.stop()
 
 # Try to load previous year's file, but don't stop if it's missing.
-prev_data = None
+prev_bundle = None
 if os.path.exists(PREV_FILE):
     try:
-        prev_data = load_qualifying_table(PREV_FILE)
+        prev_source = (PREV_FILE, os.path.getmtime(PREV_FILE))
+        prev_bundle = load_qualifying_bundle(*prev_source)
+        loaded_sources.append(prev_source)
     except Exception as e:
         st.warning(f"Found {PREV_FILE} but could not read it. Details: {e}")
-else:
-    # We'll show a friendly message only inside the tab if selected
-    prev_data = None
-
-def union_series(series_list):
-    out = pd.Series(dtype=object)
-    for s in series_list:
-        out = pd.Series(pd.unique(pd.concat([out, s.dropna().astype(str)])))
-    return sorted(out.tolist())
-
-source_series_ages = [data["Age Category"]]
-source_series_eq = [data["Equipment"]]
-male_wc_series = [data.loc[data["Sex"] == "Male", "WeightClassKg"]]
-female_wc_series = [data.loc[data["Sex"] == "Female", "WeightClassKg"]]
-
-if isinstance(prev_data, pd.DataFrame):
-    source_series_ages.append(prev_data["Age Category"])
-    source_series_eq.append(prev_data["Equipment"])
-    male_wc_series.append(prev_data.loc[prev_data["Sex"] == "Male", "WeightClassKg"])
-    female_wc_series.append(prev_data.loc[prev_data["Sex"] == "Female", "WeightClassKg"])
-
-ages = union_series(source_series_ages)
-eqs = union_series(source_series_eq)
-male_wcs = sorted(pd.unique(pd.concat(male_wc_series).astype(str)).tolist(), key=numeric_sort_key_wc)
-female_wcs = sorted(pd.unique(pd.concat(female_wc_series).astype(str)).tolist(), key=numeric_sort_key_wc)
-
-if "tested_state" not in st.session_state:
-    st.session_state["tested_state"] = "All"
-
-cols = st.columns([1.2, 1.8, 1.8, 1.8, 1.6, 1.2, 0.9])
-c_gender, c_age, c_wc_f, c_wc_m, c_eq, c_tested, c_reset = cols
-
-with c_gender:
-    st.multiselect("Gender", options=["Male", "Female"], key="gender")
-
-with c_age:
-    st.multiselect("Age Category", options=ages, key="ages")
-
-selected_gender = st.session_state.get("gender") or []
-show_female_wc = (selected_gender == ["Female"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
-show_male_wc = (selected_gender == ["Male"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
-
-with c_wc_f:
-    if show_female_wc:
-        st.multiselect("Female Weight Class (Kg)", options=female_wcs, key="wcs_female")
-    else:
-        st.empty()
-
-with c_wc_m:
-    if show_male_wc:
-        st.multiselect("Male Weight Class (Kg)", options=male_wcs, key="wcs_male")
-    else:
-        st.empty()
 
-with c_eq:
-    st.multiselect("Equipment", options=eqs, key="equipment")
+choices = filter_choices(tuple(loaded_sources))
 
-with c_tested:
-    st.selectbox("Tested", options=["All", "Tested", "Untested"], key="tested_state")
-
-with c_reset:
-    st.button("Reset", on_click=reset_filters)
+render_filter_controls(choices)
 
 st.markdown("---")
 
 tab_sbd, tab_singles, tab_prev, tab_qualified = st.tabs(["Full Power (SBD)", "Single Lifts (B & D)", "2025 Qualifying Totals", "Qualified Athletes"])
 
 with tab_sbd:
-    sbd_df = data[data["Event"] == "SBD"]
-    sbd_view = filter_with_controls(sbd_df)
+    sbd_view = filter_with_controls(bundle["sbd"])
     show_table(sbd_view, "Full Power (SBD)")
 
 with tab_singles:
-    singles_df = data[data["Event"].isin(["B", "D"])]
-    singles_view = filter_with_controls(singles_df)
+    singles_view = filter_with_controls(bundle["singles"])
     show_table(singles_view, "Single Lifts (B & D)")
 
 with tab_prev:
-    if prev_data is None:
+    if prev_bundle is None:
         st.info(f"Add **{PREV_FILE}** next to `app.py` to view previous year’s qualifying totals here.")
     else:
         st.markdown("#### Previous Year — Based on 2025_FP.xlsx")
-        prev_sbd = prev_data[prev_data["Event"] == "SBD"]
-        prev_singles = prev_data[prev_data["Event"].isin(["B", "D"])]
-
-        prev_sbd_view = filter_with_controls(prev_sbd)
+        prev_sbd_view = filter_with_controls(prev_bundle["sbd"])
         show_table(prev_sbd_view, "Previous Year — Full Power (SBD)")
 
         st.markdown("---")
-        prev_singles_view = filter_with_controls(prev_singles)
+        prev_singles_view = filter_with_controls(prev_bundle["singles"])
         show_table(prev_singles_view, "Previous Year — Single Lifts (B & D)")
 
 
@@ -698,7 +535,7 @@ with tab_qualified:
         st.error(f"{QUALIFIED_FILE} not found.")
     else:
         try:
-            qualified_data = load_qualified_athletes(QUALIFIED_FILE)
+            qualified_data = load_qualified_athletes(QUALIFIED_FILE, os.path.getmtime(QUALIFIED_FILE))
         except Exception as e:
             st.error(f"Could not read {QUALIFIED_FILE}: {e}")
         else:
@@ -719,13 +556,13 @@ with tab_qualified:
             else:
                 query = search_name.lower()
                 results = qualified_data[
-                    qualified_data["Name"].str.lower().str.contains(query, regex=False, na=False)
+                    qualified_data["_SearchName"].str.contains(query, regex=False)
                 ].copy()
 
                 if results.empty:
                     st.warning("No matching athlete found.")
                 else:
-                    results["_rank"] = results["Name"].str.lower().apply(
+                    results["_rank"] = results["_SearchName"].apply(
                         lambda n: 0 if n == query else 1 if n.startswith(query) else 2
                     )
                     results = results.sort_values(["_rank", "Name"]).drop(columns=["_rank"])
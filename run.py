@@ -1,14 +1,24 @@
 import os
-import io
-import re
 import html
-import unicodedata
-from datetime import datetime
-from difflib import SequenceMatcher
 
 import pandas as pd
 import streamlit as st
 
+from wrpf.core import (
+    TABLE_CSS,
+    filter_choices,
+    filter_with_controls,
+    load_qualifying_bundle,
+    render_filter_controls,
+    show_table,
+)
+from wrpf.qualified import (
+    DISCIPLINE_GROUPS,
+    format_qualified_database_updated,
+    load_qualified_athletes,
+    search_qualified_athletes,
+)
+
 st.set_page_config(page_title="WRPF UK — Qualifying Totals", layout="wide")
 
 
@@ -372,6 +382,8 @@ def inject_app_style():
       background: var(--wrpf-good-bg);
       color: #065f46;
     }
+
+    """ + TABLE_CSS + """
     </style>
     """, unsafe_allow_html=True)
 
@@ -387,301 +399,8 @@ def render_page_hero():
     </div>
     """, unsafe_allow_html=True)
 
-def load_qualifying_table(file_path_or_obj) -> pd.DataFrame:
-    name = ""
-    if isinstance(file_path_or_obj, (io.BytesIO, io.StringIO)) or hasattr(file_path_or_obj, "read"):
-        name = getattr(file_path_or_obj, "name", "").lower()
-    else:
-        name = str(file_path_or_obj).lower()
-
-    if name.endswith((".xlsx", ".xls")) or (isinstance(file_path_or_obj, str) and os.path.exists(file_path_or_obj)):
-        xls = pd.ExcelFile(file_path_or_obj)
-        frames = [pd.read_excel(xls, sheet_name=sheet) for sheet in xls.sheet_names]
-        wide = pd.concat(frames, ignore_index=True)
-    elif name.endswith(".csv"):
-        wide = pd.read_csv(file_path_or_obj)
-    else:
-        raise ValueError("Unsupported file type or file not found.")
-
-    base_cols = {"Age Category", "Sex", "Event", "Tested", "Equipment"}
-    weight_cols = [c for c in wide.columns if c not in base_cols]
-
-    long_df = wide.melt(
-        id_vars=["Age Category", "Sex", "Event", "Tested", "Equipment"],
-        value_vars=weight_cols,
-        var_name="WeightClassKg",
-        value_name="QualifyingTotalKg",
-    )
-
-    for c in ["Age Category", "Sex", "Event", "Tested", "Equipment", "WeightClassKg"]:
-        long_df[c] = long_df[c].astype(str).str.strip()
-    long_df = long_df[~long_df["QualifyingTotalKg"].isna()]
-
-    tested_map = {
-        "yes": "Tested", "true": "Tested", "tested": "Tested",
-        "no": "Untested", "false": "Untested", "untested": "Untested",
-    }
-    long_df["Tested"] = long_df["Tested"].str.lower().map(tested_map).fillna(long_df["Tested"])
-
-    return long_df
-
-
-def numeric_sort_key_wc(x: str):
-    s = str(x)
-    try:
-        return (float(s.replace("+", "")), s)
-    except ValueError:
-        return (float("inf"), s)
-
-
-def reset_filters():
-    for key in ["gender", "ages", "wcs_male", "wcs_female", "equipment", "tested_state"]:
-        if key in st.session_state:
-            del st.session_state[key]
-
-
-def filter_with_controls(df: pd.DataFrame) -> pd.DataFrame:
-    gender = st.session_state.get("gender") or []
-    ages = st.session_state.get("ages") or []
-    wcs_male = st.session_state.get("wcs_male") or []
-    wcs_female = st.session_state.get("wcs_female") or []
-    equipment = st.session_state.get("equipment") or []
-    tested_state = st.session_state.get("tested_state", "All")
-
-    out = df.copy()
-
-    if gender:
-        out = out[out["Sex"].isin(gender)]
-
-    if ages:
-        out = out[out["Age Category"].isin(ages)]
-
-    if gender == ["Female"]:
-        if wcs_female:
-            out = out[out["WeightClassKg"].isin(wcs_female)]
-    elif gender == ["Male"]:
-        if wcs_male:
-            out = out[out["WeightClassKg"].isin(wcs_male)]
-    else:
-        combined = list(set(wcs_male) | set(wcs_female))
-        if combined:
-            out = out[out["WeightClassKg"].isin(combined)]
-
-    if equipment:
-        out = out[out["Equipment"].isin(equipment)]
-
-    if tested_state == "Tested":
-        out = out[out["Tested"].str.lower() == "tested"]
-    elif tested_state == "Untested":
-        out = out[out["Tested"].str.lower() == "untested"]
-
-    return out
-
-
-def show_table(df: pd.DataFrame, title: str):
-    st.markdown(f"### {title}")
-    st.markdown("""
-    <style>
-    .stDataFrame [data-testid="stHeader"] { position: sticky; top: 0; z-index: 1; }
-    .stDataFrame [role="gridcell"] { border-bottom: 1px solid rgba(0,0,0,0.05); }
-    .stDataFrame tbody tr:nth-child(even) [role="gridcell"] { background: rgba(0,0,0,0.02); }
-    .stDataFrame th div p { font-weight: 700; letter-spacing: .2px; }
-    </style>
-    """, unsafe_allow_html=True)
-
-    display_cols = [
-        "Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg", "QualifyingTotalKg",
-    ]
-    view_to_show = (
-        df[display_cols]
-        .sort_values(by=["Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg"], kind="mergesort")
-    )
-
-    st.dataframe(view_to_show, use_container_width=True, hide_index=True)
-
-    csv_bytes = view_to_show.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        f"Download {title} (CSV)",
-        data=csv_bytes,
-        file_name=f"qualifying_totals_{title.replace(' ', '_').lower()}.csv",
-        mime="text/csv",
-        use_container_width=True,
-    )
-
 QUALIFIED_FILE = "Qualified.csv"
 
-OPEN_PUBLIC_LABEL = "Teen, Junior & Open Nationals"
-
-DISCIPLINE_GROUPS = [
-    (
-        "Open Nationals",
-        OPEN_PUBLIC_LABEL,
-        [
-            ("Open Nationals Full Power", "Full Power"),
-            ("Open Nationals Bench Only", "Bench Only"),
-            ("Open Nationals Deadlift Only", "Deadlift Only"),
-        ],
-    ),
-    (
-        "Masters Nationals",
-        "Masters Nationals",
-        [
-            ("Masters Nationals Full Power", "Full Power"),
-            ("Masters Nationals Bench Only", "Bench Only"),
-            ("Masters Nationals Deadlift Only", "Deadlift Only"),
-        ],
-    ),
-]
-
-DISCIPLINE_COLUMNS = [column for _, _, columns in DISCIPLINE_GROUPS for column, _ in columns]
-
-
-def normalise_name_for_search(value) -> str:
-    """Normalise names so public search copes with case, hyphens, punctuation, accents, and spacing."""
-    value = "" if pd.isna(value) else str(value)
-    value = unicodedata.normalize("NFKD", value)
-    value = "".join(ch for ch in value if not unicodedata.combining(ch))
-    value = value.lower()
-    value = re.sub(r"[^a-z0-9]+", " ", value)
-    return re.sub(r"\s+", " ", value).strip()
-
-
-def reversed_name(value: str) -> str:
-    parts = normalise_name_for_search(value).split()
-    if len(parts) < 2:
-        return ""
-    return " ".join(parts[::-1])
-
-
-def format_qualified_database_updated(file_path: str) -> str:
-    modified = datetime.fromtimestamp(os.path.getmtime(file_path))
-    return modified.strftime("%d/%m/%Y %H:%M")
-
-
-def fuzzy_ratio(left: str, right: str) -> float:
-    if not left or not right:
-        return 0.0
-    return SequenceMatcher(None, left, right).ratio()
-
-
-def search_qualified_athletes(qualified: pd.DataFrame, search_text: str) -> pd.DataFrame:
-    query = normalise_name_for_search(search_text)
-    if not query:
-        return qualified.iloc[0:0].copy()
-
-    query_parts = query.split()
-    matches = []
-
-    for idx, row in qualified.iterrows():
-        name_norm = row.get("_SearchName", "")
-        name_reverse = row.get("_SearchNameReversed", "")
-        variants = [v for v in [name_norm, name_reverse] if v]
-
-        rank = None
-        score = 0.0
-
-        if query in variants:
-            rank = 0
-            score = 1.0
-        elif any(v.startswith(query) for v in variants):
-            rank = 1
-            score = 0.95
-        elif any(query in v for v in variants):
-            rank = 2
-            score = 0.90
-        elif query_parts and all(part in name_norm.split() or part in name_norm for part in query_parts):
-            rank = 3
-            score = 0.85
-        elif len(query) >= 3:
-            best_full = max((fuzzy_ratio(query, v) for v in variants), default=0.0)
-            name_parts = name_norm.split()
-            best_token = max((fuzzy_ratio(query, part) for part in name_parts), default=0.0)
-
-            # Allow sensible typo tolerance without turning very short searches into a huge result set.
-            if best_full >= 0.78 or (len(query_parts) == 1 and best_token >= 0.82):
-                rank = 4
-                score = max(best_full, best_token)
-
-        if rank is not None:
-            matches.append((idx, rank, score))
-
-    if not matches:
-        return qualified.iloc[0:0].copy()
-
-    result_indexes = [idx for idx, _, _ in matches]
-    ranked = qualified.loc[result_indexes].copy()
-    rank_map = {idx: rank for idx, rank, _ in matches}
-    score_map = {idx: score for idx, _, score in matches}
-    ranked["_SearchRank"] = ranked.index.map(rank_map)
-    ranked["_SearchScore"] = ranked.index.map(score_map)
-
-    return (
-        ranked
-        .sort_values(["_SearchRank", "_SearchScore", "Name"], ascending=[True, False, True])
-        .drop(columns=["_SearchRank", "_SearchScore"], errors="ignore")
-        .reset_index(drop=True)
-    )
-
-
-def normalise_yes(value) -> str:
-    value = "" if pd.isna(value) else str(value).strip()
-    if value.lower() in {"yes", "y", "true", "1", "qualified"}:
-        return "Yes"
-    return ""
-
-
-def load_qualified_athletes(file_path: str) -> pd.DataFrame:
-    qualified = pd.read_csv(file_path, encoding="utf-8-sig")
-    qualified.columns = [str(c).strip() for c in qualified.columns]
-
-    if "Name" not in qualified.columns:
-        raise ValueError("Missing required column: Name")
-
-    # New export format: one column per Nationals route and discipline.
-    # Example: Open Nationals Full Power, Masters Nationals Bench Only, etc.
-    missing_new_cols = [c for c in DISCIPLINE_COLUMNS if c not in qualified.columns]
-
-    if missing_new_cols:
-        # Backwards compatibility for the old two-column export. This keeps the app
-        # online if an old CSV is accidentally uploaded, but the new format is required
-        # to display exact disciplines.
-        old_cols = ["Open Nationals", "Masters Nationals"]
-        missing_old_cols = [c for c in old_cols if c not in qualified.columns]
-        if missing_old_cols:
-            raise ValueError(
-                "Missing required discipline column(s): "
-                + ", ".join(missing_new_cols)
-            )
-
-        qualified = qualified[["Name"] + old_cols].copy()
-        qualified["Open Nationals Full Power"] = qualified["Open Nationals"]
-        qualified["Open Nationals Bench Only"] = ""
-        qualified["Open Nationals Deadlift Only"] = ""
-        qualified["Masters Nationals Full Power"] = qualified["Masters Nationals"]
-        qualified["Masters Nationals Bench Only"] = ""
-        qualified["Masters Nationals Deadlift Only"] = ""
-    else:
-        qualified = qualified[["Name"] + DISCIPLINE_COLUMNS].copy()
-
-    qualified["Name"] = qualified["Name"].fillna("").astype(str).str.strip()
-    qualified = qualified[qualified["Name"] != ""].copy()
-
-    for col in DISCIPLINE_COLUMNS:
-        qualified[col] = qualified[col].apply(normalise_yes)
-
-    # If the CSV is appended to over time and a lifter appears more than once,
-    # combine the rows so the public search only shows one clear result per lifter.
-    qualified = (
-        qualified
-        .groupby("Name", as_index=False, sort=False)
-        .agg({col: (lambda s: "Yes" if any(v == "Yes" for v in s) else "") for col in DISCIPLINE_COLUMNS})
-    )
-
-    qualified["_SearchName"] = qualified["Name"].apply(normalise_name_for_search)
-    qualified["_SearchNameReversed"] = qualified["Name"].apply(reversed_name)
-
-    return qualified.sort_values("Name", kind="mergesort").reset_index(drop=True)
-
 
 def get_qualified_disciplines(row: pd.Series, columns) -> list[str]:
     return [label for column, label in columns if str(row.get(column, "")).strip().lower() == "yes"]
@@ -776,109 +495,51 @@ if not os.path.exists(DEFAULT_FILE):
     )
     st.stop()
 
+# (path, mtime) of every workbook that loaded; keys the filter-choice cache.
+loaded_sources = [(DEFAULT_FILE, os.path.getmtime(DEFAULT_FILE))]
+
 try:
-    data = load_qualifying_table(DEFAULT_FILE)
+    bundle = load_qualifying_bundle(*loaded_sources[0])
 except Exception as e:
     st.error(f"Could not read FP.xlsx. Please check the format. Details: {e}")
     st.stop()
 
 # Try to load previous year's file, but don't stop if it's missing.
-prev_data = None
+prev_bundle = None
 if os.path.exists(PREV_FILE):
     try:
-        prev_data = load_qualifying_table(PREV_FILE)
+        prev_source = (PREV_FILE, os.path.getmtime(PREV_FILE))
+        prev_bundle = load_qualifying_bundle(*prev_source)
+        loaded_sources.append(prev_source)
     except Exception as e:
         st.warning(f"Found {PREV_FILE} but could not read it. Details: {e}")
-else:
-    # We'll show a friendly message only inside the tab if selected
-    prev_data = None
-
-def union_series(series_list):
-    out = pd.Series(dtype=object)
-    for s in series_list:
-        out = pd.Series(pd.unique(pd.concat([out, s.dropna().astype(str)])))
-    return sorted(out.tolist())
-
-source_series_ages = [data["Age Category"]]
-source_series_eq = [data["Equipment"]]
-male_wc_series = [data.loc[data["Sex"] == "Male", "WeightClassKg"]]
-female_wc_series = [data.loc[data["Sex"] == "Female", "WeightClassKg"]]
-
-if isinstance(prev_data, pd.DataFrame):
-    source_series_ages.append(prev_data["Age Category"])
-    source_series_eq.append(prev_data["Equipment"])
-    male_wc_series.append(prev_data.loc[prev_data["Sex"] == "Male", "WeightClassKg"])
-    female_wc_series.append(prev_data.loc[prev_data["Sex"] == "Female", "WeightClassKg"])
-
-ages = union_series(source_series_ages)
-eqs = union_series(source_series_eq)
-male_wcs = sorted(pd.unique(pd.concat(male_wc_series).astype(str)).tolist(), key=numeric_sort_key_wc)
-female_wcs = sorted(pd.unique(pd.concat(female_wc_series).astype(str)).tolist(), key=numeric_sort_key_wc)
-
-if "tested_state" not in st.session_state:
-    st.session_state["tested_state"] = "All"
-
-cols = st.columns([1.2, 1.8, 1.8, 1.8, 1.6, 1.2, 0.9])
-c_gender, c_age, c_wc_f, c_wc_m, c_eq, c_tested, c_reset = cols
-
-with c_gender:
-    st.multiselect("Gender", options=["Male", "Female"], key="gender")
-
-with c_age:
-    st.multiselect("Age Category", options=ages, key="ages")
-
-selected_gender = st.session_state.get("gender") or []
-show_female_wc = (selected_gender == ["Female"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
-show_male_wc = (selected_gender == ["Male"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
-
-with c_wc_f:
-    if show_female_wc:
-        st.multiselect("Female Weight Class (Kg)", options=female_wcs, key="wcs_female")
-    else:
-        st.empty()
 
-with c_wc_m:
-    if show_male_wc:
-        st.multiselect("Male Weight Class (Kg)", options=male_wcs, key="wcs_male")
-    else:
-        st.empty()
+choices = filter_choices(tuple(loaded_sources))
 
-with c_eq:
-    st.multiselect("Equipment", options=eqs, key="equipment")
-
-with c_tested:
-    st.selectbox("Tested", options=["All", "Tested", "Untested"], key="tested_state")
-
-with c_reset:
-    st.button("Reset", on_click=reset_filters)
+render_filter_controls(choices)
 
 st.markdown("---")
 
 tab_sbd, tab_singles, tab_prev, tab_qualified = st.tabs(["Full Power (SBD)", "Single Lifts (B & D)", "2025 Qualifying Totals", "Qualified Athletes"])
 
 with tab_sbd:
-    sbd_df = data[data["Event"] == "SBD"]
-    sbd_view = filter_with_controls(sbd_df)
+    sbd_view = filter_with_controls(bundle["sbd"])
     show_table(sbd_view, "Full Power (SBD)")
 
 with tab_singles:
-    singles_df = data[data["Event"].isin(["B", "D"])]
-    singles_view = filter_with_controls(singles_df)
+    singles_view = filter_with_controls(bundle["singles"])
     show_table(singles_view, "Single Lifts (B & D)")
 
 with tab_prev:
-    if prev_data is None:
+    if prev_bundle is None:
         st.info(f"Add **{PREV_FILE}** next to `app.py` to view previous year’s qualifying totals here.")
     else:
         st.markdown("#### Previous Year — Based on 2025_FP.xlsx")
-        prev_sbd = prev_data[prev_data["Event"] == "SBD"]
-        prev_singles = prev_data[prev_data["Event"].isin(["B", "D"])]
-
-        prev_sbd_view = filter_with_controls(prev_sbd)
+        prev_sbd_view = filter_with_controls(prev_bundle["sbd"])
         show_table(prev_sbd_view, "Previous Year — Full Power (SBD)")
 
         st.markdown("---")
-        prev_singles_view = filter_with_controls(prev_singles)
+        prev_singles_view = filter_with_controls(prev_bundle["singles"])
         show_table(prev_singles_view, "Previous Year — Single Lifts (B & D)")
 
 
@@ -893,7 +554,7 @@ with tab_qualified:
         st.error(f"{QUALIFIED_FILE} not found.")
     else:
         try:
-            qualified_data = load_qualified_athletes(QUALIFIED_FILE)
+            qualified_data = load_qualified_athletes(QUALIFIED_FILE, os.path.getmtime(QUALIFIED_FILE))
         except Exception as e:
             st.error(f"Could not read {QUALIFIED_FILE}: {e}")
         else:
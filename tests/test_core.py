@@ -0,0 +1,99 @@
+import os
+import re
+import zipfile
+
+import openpyxl
+import pandas as pd
+
+from wrpf.core import TABLE_CACHE_SUFFIX, load_qualifying_table, read_sheet_rows
+
+
+def write_dimensionless_workbook(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Men"
+    ws.append(["Age Category", "Sex", "Event", "Tested", "Equipment", 52, 56])
+    ws.append(["24-39", "Male", "SBD", "Yes", "Raw", 400, 450])
+    ws.append(["24-39", "Male", "B", "No", "Raw", 120])  # last cell left empty
+    wb.save(path)
+
+    # Strip the <dimension> record so read-only mode yields ragged rows.
+    with zipfile.ZipFile(path) as src:
+        parts = {name: src.read(name) for name in src.namelist()}
+    sheet = "xl/worksheets/sheet1.xml"
+    parts[sheet] = re.sub(rb"<dimension[^>]*/>", b"", parts[sheet])
+    with zipfile.ZipFile(path, "w") as dst:
+        for name, data in parts.items():
+            dst.writestr(name, data)
+
+
+def test_ragged_dimensionless_sheet(tmp_path):
+    path = tmp_path / "FP.xlsx"
+    write_dimensionless_workbook(path)
+
+    with open(path, "rb") as fh:
+        table = load_qualifying_table(fh)
+
+    assert len(table) == 3
+    bench = table[table["Event"] == "B"]
+    assert bench["WeightClassKg"].tolist() == ["52"]
+    assert bench["Tested"].tolist() == ["Untested"]
+
+
+def write_workbook(path, total):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Men"
+    ws.append(["Age Category", "Sex", "Event", "Tested", "Equipment", 52])
+    ws.append(["24-39", "Male", "SBD", "Yes", "Raw", total])
+    wb.save(path)
+
+
+def test_sidecar_ignored_when_older_workbook_restored(tmp_path):
+    path = tmp_path / "FP.xlsx"
+    write_workbook(path, 400)
+    assert load_qualifying_table(str(path))["QualifyingTotalKg"].tolist() == [400]
+    assert (tmp_path / ("FP.xlsx" + TABLE_CACHE_SUFFIX)).exists()
+
+    # Simulate restoring a backup: different contents, older mtime.
+    write_workbook(path, 420)
+    os.utime(path, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+
+    assert load_qualifying_table(str(path))["QualifyingTotalKg"].tolist() == [420]
+    # Unchanged workbook is then served from the refreshed sidecar.
+    assert load_qualifying_table(str(path))["QualifyingTotalKg"].tolist() == [420]
+
+
+def test_reshape_matches_melt(tmp_path):
+    path = tmp_path / "FP.xlsx"
+    wb = openpyxl.Workbook()
+    men = wb.active
+    men.title = "Men"
+    men.append(["Age Category", "Sex", "Event", "Tested", "Equipment", 93, 105, "120+"])
+    men.append(["24-39", "Male", "SBD", "Tested", "Raw", 500, None, 600])
+    men.append(["40-49", "Male", "B", "Untested", "Wraps", None, 150, None])
+    women = wb.create_sheet("Women")
+    women.append(["Age Category", "Sex", "Event", "Tested", "Equipment", 52, 57])
+    women.append(["24-39", "Female", "SBD", "Tested", "Raw", 300, 320])
+    women.append(["18-19", "Female", "D", "Untested", "Raw", None, 140])
+    women.append(["14-15", "Female", "B", "Tested", "Raw", 60, None])
+    wb.save(path)
+
+    with open(path, "rb") as fh:
+        table = load_qualifying_table(fh)
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    wide = pd.concat([read_sheet_rows(wb[s]) for s in wb.sheetnames], ignore_index=True)
+    wb.close()
+    expected = wide.melt(
+        id_vars=["Age Category", "Sex", "Event", "Tested", "Equipment"],
+        var_name="WeightClassKg",
+        value_name="QualifyingTotalKg",
+    ).dropna(subset=["QualifyingTotalKg"])
+
+    cols = list(expected.columns)
+    assert len(table) == 7
+    pd.testing.assert_frame_equal(
+        table.sort_index()[cols].astype(str),
+        expected.astype(str),
+    )
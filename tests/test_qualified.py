@@ -0,0 +1,50 @@
+import pandas as pd
+
+from wrpf.qualified import DISCIPLINE_COLUMNS, load_qualified_athletes, search_qualified_athletes
+
+
+def load_names(tmp_path, names):
+    path = tmp_path / "Qualified.csv"
+    rows = {"Name": names, **{c: ["Yes"] * len(names) for c in DISCIPLINE_COLUMNS}}
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return load_qualified_athletes(str(path), 0.0)
+
+
+def search(qualified, text):
+    return search_qualified_athletes(qualified, text)["Name"].tolist()
+
+
+def test_exact_then_prefix_then_substring(tmp_path):
+    qualified = load_names(tmp_path, ["Adam Smithson", "Jo Smith", "Smith", "Ann Blacksmith"])
+
+    # "smith" is an exact match for "Smith", a prefix of the reversed names
+    # "smithson adam" / "smith jo" (tied, so by name), and only a substring
+    # of "ann blacksmith".
+    assert search(qualified, "smith") == ["Smith", "Adam Smithson", "Jo Smith", "Ann Blacksmith"]
+
+
+def test_reversed_name_matches(tmp_path):
+    qualified = load_names(tmp_path, ["Al Jones", "Jo Ann Smith", "Jo Smith"])
+
+    # Exact and prefix hits on the reversed name outrank the token match
+    # "Jo Ann Smith" gets from containing both words, despite sorting first.
+    assert search(qualified, "Smith, Jo") == ["Jo Smith", "Jo Ann Smith"]
+    assert search(qualified, "smith j") == ["Jo Smith", "Jo Ann Smith"]
+    assert search(qualified, "jones al") == ["Al Jones"]
+
+
+def test_single_word_name_has_no_reversed_variant(tmp_path):
+    qualified = load_names(tmp_path, ["Cher", "Sam Cher"])
+
+    assert qualified.set_index("Name").loc["Cher", "_SearchNameReversed"] == ""
+    # The empty reversed name must not count as a prefix or exact hit.
+    assert search(qualified, "cher") == ["Cher", "Sam Cher"]
+    assert search(qualified, "cher sam") == ["Sam Cher"]
+
+
+def test_search_blob_is_arrow_backed_once_loaded(tmp_path):
+    qualified = load_names(tmp_path, ["Jo Smith"])
+
+    # Converted inside the cached loader, so searches never redo it.
+    assert qualified["_SearchBlob"].dtype == "string[pyarrow]"
+    assert qualified["_SearchBlob"].tolist() == ["jo smith|smith jo"]
@@ -0,0 +1,311 @@
+"""Shared loading, filtering and table rendering for the qualifying totals apps."""
+import io
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+
+def read_sheet_rows(ws) -> pd.DataFrame:
+    # Like pandas' openpyxl reader: a missing or stale <dimension> record makes
+    # read-only rows ragged (trailing empty cells are omitted), so recompute it
+    # and treat any cell past the end of a short row as empty.
+    ws.reset_dimensions()
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    # Match read_excel: whole-number headers such as 52.0 become 52, and
+    # unnamed trailing columns / blank rows left behind by Excel are skipped.
+    keep = [i for i, h in enumerate(header) if h is not None]
+    columns = [int(header[i]) if isinstance(header[i], float) and header[i].is_integer() else header[i] for i in keep]
+    records = [
+        [row[i] if i < len(row) else None for i in keep]
+        for row in rows
+        if any(v is not None for v in row)
+    ]
+    return pd.DataFrame(records, columns=columns)
+
+
+# Tidy tables are saved next to their workbook so a cold start can skip Excel.
+# Bump the version whenever the loader's output changes (columns, rows or values).
+TABLE_CACHE_SUFFIX = ".v4.parquet"
+
+# Only these sheets hold qualifying totals; any other sheet (notes, scratch
+# work, hidden lookups) is skipped. Workbooks without them fall back to all sheets.
+QUALIFYING_SHEETS = ("Men", "Women")
+
+
+def select_sheets(sheet_names) -> list:
+    return [s for s in sheet_names if s in QUALIFYING_SHEETS] or list(sheet_names)
+
+
+# Parquet metadata key recording which workbook version a sidecar was built from.
+SOURCE_STAMP_KEY = b"wrpf.source_stamp"
+
+
+def workbook_stamp(file_path: str) -> bytes:
+    # Exact mtime and size rather than "sidecar is newer": restoring or copying
+    # in a workbook with an older mtime must still invalidate the sidecar.
+    stat = os.stat(file_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+
+
+def load_qualifying_table(file_path_or_obj) -> pd.DataFrame:
+    cache_path = None
+    if isinstance(file_path_or_obj, str) and os.path.exists(file_path_or_obj):
+        cache_path = file_path_or_obj + TABLE_CACHE_SUFFIX
+        stamp = workbook_stamp(file_path_or_obj)
+        if os.path.exists(cache_path):
+            try:
+                if (pq.read_schema(cache_path).metadata or {}).get(SOURCE_STAMP_KEY) == stamp:
+                    return pq.read_table(cache_path).to_pandas()
+            except Exception:
+                pass  # unreadable sidecar, rebuild it from the workbook below
+
+    name = ""
+    if isinstance(file_path_or_obj, (io.BytesIO, io.StringIO)) or hasattr(file_path_or_obj, "read"):
+        name = getattr(file_path_or_obj, "name", "").lower()
+    else:
+        name = str(file_path_or_obj).lower()
+
+    if name.endswith((".xlsx", ".xls")) or (isinstance(file_path_or_obj, str) and os.path.exists(file_path_or_obj)):
+        if name.endswith(".xls"):
+            xls = pd.ExcelFile(file_path_or_obj)
+            text_cols = {c: str for c in ["Age Category", "Sex", "Event", "Tested", "Equipment"]}
+            frames = [pd.read_excel(xls, sheet_name=sheet, dtype=text_cols) for sheet in select_sheets(xls.sheet_names)]
+        else:
+            # Read-only mode streams rows instead of building every cell object.
+            wb = openpyxl.load_workbook(file_path_or_obj, read_only=True, data_only=True)
+            try:
+                frames = [read_sheet_rows(wb[sheet]) for sheet in select_sheets(wb.sheetnames)]
+            finally:
+                wb.close()
+        wide = pd.concat(frames, ignore_index=True)
+    elif name.endswith(".csv"):
+        wide = pd.read_csv(file_path_or_obj)
+    else:
+        raise ValueError("Unsupported file type or file not found.")
+
+    base_cols = {"Age Category", "Sex", "Event", "Tested", "Equipment"}
+    weight_cols = [c for c in wide.columns if c not in base_cols]
+
+    # Same rows as wide.melt(...) minus the empty cells, but gathered with numpy
+    # index arithmetic so only the filled cells are ever materialised.
+    id_cols = ["Age Category", "Sex", "Event", "Tested", "Equipment"]
+    totals = wide[weight_cols].to_numpy().ravel(order="F")
+    keep = np.flatnonzero(~pd.isna(totals))
+    rows = keep % len(wide) if len(wide) else keep
+    long_df = pd.DataFrame(
+        {
+            **{c: wide[c].to_numpy()[rows] for c in id_cols},
+            "WeightClassKg": np.array(weight_cols, dtype=object)[keep // max(len(wide), 1)],
+            "QualifyingTotalKg": totals[keep],
+        },
+        index=keep,
+    )
+
+    for c in ["Age Category", "Sex", "Event", "Tested", "Equipment", "WeightClassKg"]:
+        long_df[c] = long_df[c].astype(str).str.strip()
+
+    tested_map = {
+        "yes": "Tested", "true": "Tested", "tested": "Tested",
+        "no": "Untested", "false": "Untested", "untested": "Untested",
+    }
+    # Only a few distinct spellings exist, so resolve each one once and
+    # broadcast the result back through the inverse index.
+    tested_values, tested_codes = np.unique(long_df["Tested"].to_numpy(dtype=str), return_inverse=True)
+    resolved = np.array([tested_map.get(v.lower(), v) for v in tested_values], dtype=object)
+    long_df["Tested"] = resolved[tested_codes]
+
+    # The filter columns only hold a handful of distinct values, so categories
+    # keep them small and let isin / sort work on integer codes. Weight classes
+    # are ordered numerically so sorting by them gives 52, 56, ..., 140+.
+    for c in ["Sex", "Age Category", "Event", "Tested", "Equipment"]:
+        long_df[c] = long_df[c].astype("category")
+    wc_order = sort_weight_classes(long_df["WeightClassKg"].unique())
+    long_df["WeightClassKg"] = pd.Categorical(long_df["WeightClassKg"], categories=wc_order, ordered=True)
+
+    # Sort once here in display order. The filters only apply boolean masks,
+    # which keep row order, so show_table never has to re-sort.
+    long_df = long_df.sort_values(
+        by=["Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg"], kind="mergesort"
+    )
+
+    if cache_path:
+        try:
+            table = pa.Table.from_pandas(long_df)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_STAMP_KEY: stamp})
+            pq.write_table(table, cache_path, compression="zstd")
+        except Exception:
+            pass  # read-only folder or mixed-type cells; the sidecar is optional
+
+    return long_df
+
+
+@st.cache_data(show_spinner=False)
+def load_qualifying_bundle(file_path: str, mtime: float) -> dict:
+    # mtime is only part of the cache key, so replacing the workbook on disk
+    # invalidates the cached table without restarting the app.
+    long_df = load_qualifying_table(file_path)
+    return {
+        "all": long_df,
+        "sbd": long_df[long_df["Event"] == "SBD"].copy(),
+        "singles": long_df[long_df["Event"].isin(["B", "D"])].copy(),
+    }
+
+
+def sort_weight_classes(values) -> list:
+    # Numeric order (52, 56, ..., 140, 140+); labels that are not numbers go last.
+    labels = pd.Series(list(values), dtype=object).astype(str)
+    nums = pd.to_numeric(labels.str.replace("+", "", regex=False), errors="coerce").fillna(np.inf)
+    order = pd.DataFrame({"num": nums, "label": labels}).sort_values(["num", "label"], kind="mergesort")
+    return order["label"].tolist()
+
+
+def reset_filters():
+    for key in ["gender", "ages", "wcs_male", "wcs_female", "equipment", "tested_state"]:
+        if key in st.session_state:
+            del st.session_state[key]
+
+
+def filter_with_controls(df: pd.DataFrame) -> pd.DataFrame:
+    gender = st.session_state.get("gender") or []
+    ages = st.session_state.get("ages") or []
+    wcs_male = st.session_state.get("wcs_male") or []
+    wcs_female = st.session_state.get("wcs_female") or []
+    equipment = st.session_state.get("equipment") or []
+    tested_state = st.session_state.get("tested_state", "All")
+
+    # One combined mask, one slice at the end; the cached input is never copied.
+    mask = np.ones(len(df), dtype=bool)
+
+    if gender:
+        mask &= df["Sex"].isin(gender).to_numpy()
+
+    if ages:
+        mask &= df["Age Category"].isin(ages).to_numpy()
+
+    if gender == ["Female"]:
+        if wcs_female:
+            mask &= df["WeightClassKg"].isin(wcs_female).to_numpy()
+    elif gender == ["Male"]:
+        if wcs_male:
+            mask &= df["WeightClassKg"].isin(wcs_male).to_numpy()
+    else:
+        combined = list(set(wcs_male) | set(wcs_female))
+        if combined:
+            mask &= df["WeightClassKg"].isin(combined).to_numpy()
+
+    if equipment:
+        mask &= df["Equipment"].isin(equipment).to_numpy()
+
+    # The loader already normalises every spelling to "Tested" / "Untested".
+    if tested_state in ("Tested", "Untested"):
+        mask &= (df["Tested"] == tested_state).to_numpy()
+
+    return df[mask]
+
+
+# Rules for the tables show_table renders. Each app includes this in its own
+# stylesheet so the CSS is emitted once per run rather than once per table.
+TABLE_CSS = """
+    .stDataFrame [data-testid="stHeader"] { position: sticky; top: 0; z-index: 1; }
+    .stDataFrame [role="gridcell"] { border-bottom: 1px solid rgba(0,0,0,0.05); }
+    .stDataFrame tbody tr:nth-child(even) [role="gridcell"] { background: rgba(0,0,0,0.02); }
+    .stDataFrame th div p { font-weight: 700; letter-spacing: .2px; }
+"""
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _csv_bytes(rows_signature: tuple, _df: pd.DataFrame) -> bytes:
+    # The leading underscore stops Streamlit hashing the frame itself; the
+    # signature (title, row count, row hash) identifies the view instead.
+    return _df.to_csv(index=False).encode("utf-8")
+
+
+def show_table(df: pd.DataFrame, title: str):
+    st.markdown(f"### {title}")
+
+    display_cols = [
+        "Sex", "Age Category", "Event", "Tested", "Equipment", "WeightClassKg", "QualifyingTotalKg",
+    ]
+    view_to_show = df[display_cols]
+
+    st.dataframe(view_to_show, use_container_width=True, hide_index=True)
+
+    rows_signature = (title, len(view_to_show), int(pd.util.hash_pandas_object(view_to_show).sum()))
+    csv_bytes = _csv_bytes(rows_signature, view_to_show)
+    st.download_button(
+        f"Download {title} (CSV)",
+        data=csv_bytes,
+        file_name=f"qualifying_totals_{title.replace(' ', '_').lower()}.csv",
+        mime="text/csv",
+        use_container_width=True,
+    )
+
+
+def union_series(series_list, sorter=sorted):
+    values = pd.unique(pd.concat([s.dropna().astype(str) for s in series_list], ignore_index=True))
+    return sorter(values.tolist())
+
+
+@st.cache_data(show_spinner=False)
+def filter_choices(sources: tuple) -> dict:
+    # Keyed on the workbooks' (path, mtime) pairs rather than the frames
+    # themselves, which cache_data hands back as fresh copies on every run.
+    frames = [load_qualifying_bundle(path, mtime)["all"] for path, mtime in sources]
+    return {
+        "ages": union_series([f["Age Category"] for f in frames]),
+        "eqs": union_series([f["Equipment"] for f in frames]),
+        "male_wcs": union_series(
+            [f.loc[f["Sex"] == "Male", "WeightClassKg"] for f in frames], sorter=sort_weight_classes
+        ),
+        "female_wcs": union_series(
+            [f.loc[f["Sex"] == "Female", "WeightClassKg"] for f in frames], sorter=sort_weight_classes
+        ),
+    }
+
+
+def render_filter_controls(choices: dict):
+    if "tested_state" not in st.session_state:
+        st.session_state["tested_state"] = "All"
+
+    cols = st.columns([1.2, 1.8, 1.8, 1.8, 1.6, 1.2, 0.9])
+    c_gender, c_age, c_wc_f, c_wc_m, c_eq, c_tested, c_reset = cols
+
+    with c_gender:
+        st.multiselect("Gender", options=["Male", "Female"], key="gender")
+
+    with c_age:
+        st.multiselect("Age Category", options=choices["ages"], key="ages")
+
+    selected_gender = st.session_state.get("gender") or []
+    show_female_wc = (selected_gender == ["Female"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
+    show_male_wc = (selected_gender == ["Male"]) or (not selected_gender) or (set(selected_gender) == {"Male", "Female"})
+
+    with c_wc_f:
+        if show_female_wc:
+            st.multiselect("Female Weight Class (Kg)", options=choices["female_wcs"], key="wcs_female")
+        else:
+            st.empty()
+
+    with c_wc_m:
+        if show_male_wc:
+            st.multiselect("Male Weight Class (Kg)", options=choices["male_wcs"], key="wcs_male")
+        else:
+            st.empty()
+
+    with c_eq:
+        st.multiselect("Equipment", options=choices["eqs"], key="equipment")
+
+    with c_tested:
+        st.selectbox("Tested", options=["All", "Tested", "Untested"], key="tested_state")
+
+    with c_reset:
+        st.button("Reset", on_click=reset_filters)
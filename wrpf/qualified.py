@@ -0,0 +1,189 @@
+"""Qualified-athlete database loading and name search for the Nationals lookup."""
+import os
+import re
+import unicodedata
+from datetime import datetime
+from difflib import SequenceMatcher
+
+import pandas as pd
+import streamlit as st
+
+
+OPEN_PUBLIC_LABEL = "Teen, Junior & Open Nationals"
+
+DISCIPLINE_GROUPS = [
+    (
+        "Open Nationals",
+        OPEN_PUBLIC_LABEL,
+        [
+            ("Open Nationals Full Power", "Full Power"),
+            ("Open Nationals Bench Only", "Bench Only"),
+            ("Open Nationals Deadlift Only", "Deadlift Only"),
+        ],
+    ),
+    (
+        "Masters Nationals",
+        "Masters Nationals",
+        [
+            ("Masters Nationals Full Power", "Full Power"),
+            ("Masters Nationals Bench Only", "Bench Only"),
+            ("Masters Nationals Deadlift Only", "Deadlift Only"),
+        ],
+    ),
+]
+
+DISCIPLINE_COLUMNS = [column for _, _, columns in DISCIPLINE_GROUPS for column, _ in columns]
+
+
+def normalise_name_for_search(value) -> str:
+    """Normalise names so public search copes with case, hyphens, punctuation, accents, and spacing."""
+    value = "" if pd.isna(value) else str(value)
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    value = value.lower()
+    value = re.sub(r"[^a-z0-9]+", " ", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def reversed_name(value: str) -> str:
+    parts = normalise_name_for_search(value).split()
+    if len(parts) < 2:
+        return ""
+    return " ".join(parts[::-1])
+
+
+def format_qualified_database_updated(file_path: str) -> str:
+    modified = datetime.fromtimestamp(os.path.getmtime(file_path))
+    return modified.strftime("%d/%m/%Y %H:%M")
+
+
+def fuzzy_ratio(left: str, right: str) -> float:
+    if not left or not right:
+        return 0.0
+    return SequenceMatcher(None, left, right).ratio()
+
+
+def search_qualified_athletes(qualified: pd.DataFrame, search_text: str) -> pd.DataFrame:
+    query = normalise_name_for_search(search_text)
+    if not query:
+        return qualified.iloc[0:0].copy()
+
+    query_parts = query.split()
+    matches = []
+
+    # Exact, prefix and substring hits (ranks 0-2) come straight from one
+    # substring scan over the precomputed blob; only the rest need the
+    # per-row token and fuzzy checks below.
+    substring_hit = qualified["_SearchBlob"].str.contains(query, regex=False)
+    hits = qualified[substring_hit]
+    exact = (hits["_SearchName"] == query) | (hits["_SearchNameReversed"] == query)
+    prefix = hits["_SearchName"].str.startswith(query) | hits["_SearchNameReversed"].str.startswith(query)
+    hit_ranks = pd.Series(2, index=hits.index).mask(prefix, 1).mask(exact, 0)
+    hit_scores = hit_ranks.map({0: 1.0, 1: 0.95, 2: 0.90})
+    matches.extend(zip(hits.index, hit_ranks, hit_scores))
+
+    for idx, row in qualified[~substring_hit].iterrows():
+        name_norm = row.get("_SearchName", "")
+        name_reverse = row.get("_SearchNameReversed", "")
+        variants = [v for v in [name_norm, name_reverse] if v]
+
+        rank = None
+        score = 0.0
+
+        if query_parts and all(part in name_norm.split() or part in name_norm for part in query_parts):
+            rank = 3
+            score = 0.85
+        elif len(query) >= 3:
+            best_full = max((fuzzy_ratio(query, v) for v in variants), default=0.0)
+            name_parts = name_norm.split()
+            best_token = max((fuzzy_ratio(query, part) for part in name_parts), default=0.0)
+
+            # Allow sensible typo tolerance without turning very short searches into a huge result set.
+            if best_full >= 0.78 or (len(query_parts) == 1 and best_token >= 0.82):
+                rank = 4
+                score = max(best_full, best_token)
+
+        if rank is not None:
+            matches.append((idx, rank, score))
+
+    if not matches:
+        return qualified.iloc[0:0].copy()
+
+    result_indexes = [idx for idx, _, _ in matches]
+    ranked = qualified.loc[result_indexes].copy()
+    rank_map = {idx: rank for idx, rank, _ in matches}
+    score_map = {idx: score for idx, _, score in matches}
+    ranked["_SearchRank"] = ranked.index.map(rank_map)
+    ranked["_SearchScore"] = ranked.index.map(score_map)
+
+    return (
+        ranked
+        .sort_values(["_SearchRank", "_SearchScore", "Name"], ascending=[True, False, True])
+        .drop(columns=["_SearchRank", "_SearchScore"], errors="ignore")
+        .reset_index(drop=True)
+    )
+
+
+def normalise_yes(value) -> str:
+    value = "" if pd.isna(value) else str(value).strip()
+    if value.lower() in {"yes", "y", "true", "1", "qualified"}:
+        return "Yes"
+    return ""
+
+
+@st.cache_data(show_spinner=False)
+def load_qualified_athletes(file_path: str, mtime: float) -> pd.DataFrame:
+    # Cached per file version (mtime is only part of the key) so the search
+    # columns below are built once, not on every keystroke's rerun.
+    qualified = pd.read_csv(file_path, encoding="utf-8-sig")
+    qualified.columns = [str(c).strip() for c in qualified.columns]
+
+    if "Name" not in qualified.columns:
+        raise ValueError("Missing required column: Name")
+
+    # New export format: one column per Nationals route and discipline.
+    # Example: Open Nationals Full Power, Masters Nationals Bench Only, etc.
+    missing_new_cols = [c for c in DISCIPLINE_COLUMNS if c not in qualified.columns]
+
+    if missing_new_cols:
+        # Backwards compatibility for the old two-column export. This keeps the app
+        # online if an old CSV is accidentally uploaded, but the new format is required
+        # to display exact disciplines.
+        old_cols = ["Open Nationals", "Masters Nationals"]
+        missing_old_cols = [c for c in old_cols if c not in qualified.columns]
+        if missing_old_cols:
+            raise ValueError(
+                "Missing required discipline column(s): "
+                + ", ".join(missing_new_cols)
+            )
+
+        qualified = qualified[["Name"] + old_cols].copy()
+        qualified["Open Nationals Full Power"] = qualified["Open Nationals"]
+        qualified["Open Nationals Bench Only"] = ""
+        qualified["Open Nationals Deadlift Only"] = ""
+        qualified["Masters Nationals Full Power"] = qualified["Masters Nationals"]
+        qualified["Masters Nationals Bench Only"] = ""
+        qualified["Masters Nationals Deadlift Only"] = ""
+    else:
+        qualified = qualified[["Name"] + DISCIPLINE_COLUMNS].copy()
+
+    qualified["Name"] = qualified["Name"].fillna("").astype(str).str.strip()
+    qualified = qualified[qualified["Name"] != ""].copy()
+
+    for col in DISCIPLINE_COLUMNS:
+        qualified[col] = qualified[col].apply(normalise_yes)
+
+    # If the CSV is appended to over time and a lifter appears more than once,
+    # combine the rows so the public search only shows one clear result per lifter.
+    qualified = (
+        qualified
+        .groupby("Name", as_index=False, sort=False)
+        .agg({col: (lambda s: "Yes" if any(v == "Yes" for v in s) else "") for col in DISCIPLINE_COLUMNS})
+    )
+
+    qualified["_SearchName"] = qualified["Name"].apply(normalise_name_for_search)
+    qualified["_SearchNameReversed"] = qualified["Name"].apply(reversed_name)
+    # Arrow-backed so substring search runs as one pyarrow match_substring kernel.
+    qualified["_SearchBlob"] = (qualified["_SearchName"] + "|" + qualified["_SearchNameReversed"]).astype("string[pyarrow]")
+
+    return qualified.sort_values("Name", kind="mergesort").reset_index(drop=True)